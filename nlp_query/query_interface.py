@@ -1,12 +1,587 @@
 import sqlite3
 import re
 import json
-from typing import Dict, List, Tuple
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Natural language words for each table the planner can return rows from.
+# 'document types' has to be tried before 'documents'.
+ENTITY_PATTERNS = [
+    ('document_types', r'\bdocument types?\b'),
+    ('document_submissions', r'\b(?:documents?|submissions?)\b'),
+    ('customers', r'\b(?:customers?|clients?|applicants?)\b'),
+    ('processes', r'\bprocess(?:es| types?)?\b'),
+    ('process_assignments', r'\bassignments?\b'),
+]
+
+# Columns shown when a table is the head of a planned query
+DISPLAY_COLUMNS = {
+    'customers': ['id', 'name', 'email', 'phone', 'registration_date'],
+    'processes': ['id', 'name', 'description', 'status'],
+    'document_types': ['id', 'name', 'description'],
+    'document_submissions': ['id', 'file_url', 'upload_date', 'validation_status'],
+    'process_assignments': ['id', 'assignment_date', 'status', 'completion_percentage'],
+}
+
+# Singular labels used for output column names (process_name, document_count, ...)
+TABLE_LABELS = {
+    'customers': 'customer',
+    'processes': 'process',
+    'document_types': 'document_type',
+    'document_submissions': 'document',
+    'process_assignments': 'assignment',
+    'process_document_requirements': 'requirement',
+}
+
+# Words that say how a listed entity relates to a filtered one
+RELATION_PATTERNS = [
+    ('submitted', r'\b(?:submitted|uploaded)(?: for| by)?\b'),
+    ('required', r'\b(?:requiring|requires?|required(?: for| by)?|needed for)\b'),
+    ('assigned', r'\b(?:assigned(?: to)?|enrolled in|applied for)\b'),
+]
+
+# Tables linking a listed entity to a filtered one that has no direct foreign key,
+# by relationship. The first relationship is used when the query doesn't name one.
+JOIN_PATHS = {
+    ('customers', 'processes'): {'assigned': ['process_assignments'],
+                                 'submitted': ['document_submissions']},
+    ('processes', 'customers'): {'assigned': ['process_assignments'],
+                                 'submitted': ['document_submissions']},
+    ('customers', 'document_types'): {'submitted': ['document_submissions']},
+    ('document_types', 'customers'): {'submitted': ['document_submissions']},
+    ('processes', 'document_types'): {'required': ['process_document_requirements'],
+                                      'submitted': ['document_submissions']},
+    ('document_types', 'processes'): {'required': ['process_document_requirements'],
+                                      'submitted': ['document_submissions']},
+    ('document_types', 'process_assignments'): {'required': ['process_document_requirements', 'processes']},
+    ('process_assignments', 'document_types'): {'required': ['processes', 'process_document_requirements']},
+}
+
+COMPARISON_OPERATORS = {
+    'fewer than': '<', 'less than': '<', 'under': '<', 'below': '<',
+    'more than': '>', 'over': '>', 'above': '>',
+    'at least': '>=', 'at most': '<=', 'exactly': '=',
+}
+COMPARISON_WORDS = '|'.join(sorted(COMPARISON_OPERATORS, key=len, reverse=True))
+
+# Words that carry no meaning of their own once the rest of a query is parsed
+FILLER_WORDS = {
+    'show', 'list', 'display', 'find', 'get', 'give', 'me', 'all', 'the', 'a', 'an',
+    'which', 'what', 'who', 'whose', 'are', 'is', 'was', 'were', 'that', 'have', 'has',
+    'had', 'with', 'for', 'to', 'in', 'of', 'and', 'or', 'named', 'called', 'please', 'details',
+    'info', 'information',
+}
+
+STATUS_WORDS = {'pending', 'completed', 'complete', 'finished', 'approved', 'rejected', 'active', 'inactive'}
+
+# Words the planner gives a meaning to; names made of these would swallow them
+KEYWORDS = STATUS_WORDS | {word for phrase in COMPARISON_OPERATORS for word in phrase.split()} | {
+    'and', 'or', 'not', 'no', 'with', 'without', 'how', 'many', 'count', 'number',
+    'top', 'first', 'limit', 'sorted', 'ordered', 'by', 'newest', 'latest', 'recent', 'oldest',
+    'earliest', 'most', 'fewest', 'least', 'highest', 'completion', 'progress', 'percent',
+    'submitted', 'uploaded', 'requiring', 'requires', 'required', 'assigned', 'enrolled', 'applied',
+}
+
+# Fallback selectivities when sqlite_stat1 has nothing for a column
+EQUALITY_SELECTIVITY = 0.1
+RANGE_SELECTIVITY = 0.25
+
+# Add a LIMIT when a query is estimated to return more rows than this
+MAX_RESULT_ROWS = 200
+
+# Reject a customer name fragment that matches more customers than this
+MAX_NAME_MATCHES = 50
+
+# Seconds between reloads of the statistics and name vocabulary
+REFRESH_INTERVAL = 60
+
+
+@dataclass
+class QueryPlan:
+    """Structured form of a natural language query"""
+    head: Optional[str] = None
+    filters: List[Tuple[str, str, str, object]] = field(default_factory=list)
+    document_count: Optional[Tuple[str, int]] = None
+    order: Optional[Tuple[str, str]] = None
+    limit: Optional[int] = None
+    explicit_limit: bool = False
+    count_only: bool = False
+    relation: Optional[str] = None
+    # Set by QueryPlanner.compile when it adds a LIMIT the query didn't ask for
+    auto_limit: Optional[int] = None
+
+    def add_equality(self, table: str, column: str, value):
+        """Add `column = value`, turning repeated values for one column into IN (...)"""
+        for i, (filter_table, filter_column, operator, existing) in enumerate(self.filters):
+            if (filter_table, filter_column) == (table, column) and operator in ('=', 'IN'):
+                values = existing if operator == 'IN' else (existing,)
+                if value not in values:
+                    self.filters[i] = (table, column, 'IN', values + (value,))
+                return
+        self.filters.append((table, column, '=', value))
+
+    def clause_count(self) -> int:
+        """Number of independent intents (filters, aggregation, ordering, limit)"""
+        return (len(self.filters) + bool(self.document_count)
+                + bool(self.order) + bool(self.explicit_limit))
+
+
+class QueryPlanner:
+    """Compose a single SQL statement from entities, filters, aggregations and ordering.
+
+    Joins follow fixed relationships from the schema catalog (see JOIN_PATHS).
+    Table statistics from sqlite_stat1 only decide when to add a LIMIT; SQLite's
+    own query planner uses the same data to order the joins. Statistics are
+    only written by an explicit call to analyze().
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        conn = sqlite3.connect(db_path)
+        try:
+            self.columns, self.foreign_keys = self._load_catalog(conn)
+            self.row_counts, self.index_stats = self._load_statistics(conn)
+            self.vocabulary, self.vocabulary_pattern = self._load_vocabulary(conn)
+        finally:
+            conn.close()
+        self.loaded_at = time.monotonic()
+
+    def refresh(self, max_age: float = REFRESH_INTERVAL):
+        """Reload statistics and names if they were loaded more than `max_age` seconds ago"""
+        if time.monotonic() - self.loaded_at < max_age:
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.row_counts, self.index_stats = self._load_statistics(conn)
+            self.vocabulary, self.vocabulary_pattern = self._load_vocabulary(conn)
+        finally:
+            conn.close()
+        self.loaded_at = time.monotonic()
+
+    def analyze(self):
+        """Run ANALYZE to rebuild sqlite_stat1, then reload the statistics.
+
+        This writes to the database, so it is meant for start-up or maintenance,
+        never for the query path.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("ANALYZE")
+            conn.commit()
+            self.row_counts, self.index_stats = self._load_statistics(conn)
+        except sqlite3.Error as e:
+            print(f"Could not analyze database: {e}")
+        finally:
+            conn.close()
+
+    def _load_catalog(self, conn: sqlite3.Connection) -> Tuple[Dict, List]:
+        """Read column types and foreign keys for every user table"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        tables = [row[0] for row in cursor.fetchall()]
+
+        columns = {}
+        foreign_keys = []
+        for table in tables:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns[table] = {row[1]: (row[2] or '').upper() for row in cursor.fetchall()}
+            cursor.execute(f"PRAGMA foreign_key_list({table})")
+            for row in cursor.fetchall():
+                # (child table, child column, parent table, parent column)
+                foreign_keys.append((table, row[3], row[2], row[4] or 'id'))
+        return columns, foreign_keys
+
+    def _load_statistics(self, conn: sqlite3.Connection) -> Tuple[Dict, Dict]:
+        """Read row counts and per-index rows-per-key from sqlite_stat1 as it is"""
+        row_counts = {}
+        index_stats = {}
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT tbl, idx, stat FROM sqlite_stat1")
+            stats = cursor.fetchall()
+        except sqlite3.Error:
+            stats = []
+
+        for table, index, stat in stats:
+            numbers = [int(n) for n in stat.split() if n.isdigit()]
+            if not numbers:
+                continue
+            row_counts[table] = numbers[0]
+            if index and len(numbers) > 1:
+                cursor.execute(f"PRAGMA index_info({index})")
+                first_column = cursor.fetchone()
+                if first_column:
+                    index_stats[(table, first_column[2])] = numbers[1]
+
+        # Without statistics, MAX(rowid) is a cheap estimate that reads one end of the b-tree
+        for table in self.columns:
+            if table not in row_counts:
+                cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+                row_counts[table] = cursor.fetchone()[0] or 0
+        return row_counts, index_stats
+
+    @staticmethod
+    def _reserved_words(phrase: str) -> List[bool]:
+        """For each word of `phrase`, whether the parser already gives it a meaning"""
+        return [word in KEYWORDS or word in FILLER_WORDS
+                or any(re.fullmatch(pattern, word) for _, pattern in ENTITY_PATTERNS)
+                for word in phrase.split()]
+
+    def is_name_fragment(self, phrase: str) -> bool:
+        """Whether `phrase` looks like part of a name rather than another clause"""
+        return bool(re.fullmatch(r"[a-z][a-z' .-]*", phrase)) and not any(
+            word in KEYWORDS or any(re.fullmatch(pattern, word) for _, pattern in ENTITY_PATTERNS)
+            for word in phrase.split())
+
+    def _load_vocabulary(self, conn: sqlite3.Connection) -> Tuple[Dict, Optional[re.Pattern]]:
+        """Map phrases to (table, column, value) for process and document type names.
+
+        Customer names are not preloaded; parse() looks them up when needed.
+        """
+        vocabulary = {}
+        aliases = {}
+        for table in ('processes', 'document_types'):
+            if 'name' not in self.columns.get(table, {}):
+                continue
+            for (name,) in conn.execute(f"SELECT DISTINCT name FROM {table}"):
+                if not name:
+                    continue
+                phrase = name.lower()
+                # A name made only of words like "pending" or "top" would swallow them
+                if not all(self._reserved_words(phrase)):
+                    vocabulary[phrase] = (table, 'name', name)
+                # "Home Loan" for "Home Loan Application", "KYC" for "KYC Verification"
+                words = phrase.split()
+                alias = ' '.join(words[:-1])
+                if table == 'processes' and len(words) > 1 and not any(self._reserved_words(alias)):
+                    aliases.setdefault(alias, []).append((table, 'name', name))
+        # An alias shared by several names would be ambiguous, so only unique ones are kept
+        for alias, targets in aliases.items():
+            if len(targets) == 1 and alias not in vocabulary:
+                vocabulary[alias] = targets[0]
+
+        if not vocabulary:
+            return vocabulary, None
+        # One alternation, longest phrases first so "home loan application" wins over "home loan"
+        phrases = sorted(vocabulary, key=len, reverse=True)
+        pattern = re.compile(r'\b(?:' + '|'.join(re.escape(phrase) for phrase in phrases) + r')\b')
+        return vocabulary, pattern
+
+    def _lookup_customers(self, fragment: str) -> List[str]:
+        """Customer names containing `fragment` as whole words"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(
+                """SELECT DISTINCT name FROM customers
+                   WHERE LOWER(name) = ? OR LOWER(name) LIKE ? OR LOWER(name) LIKE ? OR LOWER(name) LIKE ?
+                   LIMIT ?""",
+                (fragment, f'{fragment} %', f'% {fragment}', f'% {fragment} %', MAX_NAME_MATCHES + 1))
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def parse(self, query: str) -> QueryPlan:
+        """Break a query into head entity, filters, document counts, ordering and limit.
+
+        Words left over after that are looked up as customer names. Raises
+        ValueError if anything still isn't understood, so that e.g. "not" or an
+        unknown verb never silently widens the result.
+        """
+        plan = QueryPlan()
+        text = ' ' + ' '.join(re.sub(r'[,;:|]', ' ', query.lower()).split()) + ' '
+
+        # Matched text is replaced by '|' so the words left over stay grouped as written
+        def take(pattern):
+            nonlocal text
+            match = re.search(pattern, text)
+            if match:
+                text = text[:match.start()] + ' | ' + text[match.end():]
+            return match
+
+        if take(r'^ (?:how many|count(?: of)?|number of)\b'):
+            plan.count_only = True
+
+        match = take(r'\b(?:top|first|limit) (\d+)\b')
+        if match:
+            plan.limit = int(match.group(1))
+            plan.explicit_limit = True
+
+        order_patterns = [
+            (r'\b(?:sorted |ordered )?by (?:document count|number of documents|documents)\b', ('document_count', 'DESC')),
+            (r'\b(?:sorted |ordered )?by (?:completion|progress)\b|\bhighest (?:completion|progress)\b', ('completion', 'DESC')),
+            (r'\b(?:sorted |ordered )?(?:by name|alphabetically)\b', ('name', 'ASC')),
+            (r'\b(?:newest|latest|most recent)(?: first)?\b', ('date', 'DESC')),
+            (r'\b(?:oldest|earliest)(?: first)?\b', ('date', 'ASC')),
+        ]
+        for pattern, order in order_patterns:
+            if take(pattern):
+                plan.order = order
+                break
+
+        match = take(r'\b(?:has|have|with) (?:the )?(most|fewest|least) documents\b')
+        if match:
+            plan.order = ('document_count', 'DESC' if match.group(1) == 'most' else 'ASC')
+            if plan.limit is None:
+                plan.limit = 1
+
+        count_verbs = r'(?:with|having|(?:has |have )?submitted|has|have)'
+        match = take(rf'\b{count_verbs} ({COMPARISON_WORDS}) (\d+) documents?\b')
+        if match:
+            plan.document_count = (COMPARISON_OPERATORS[match.group(1)], int(match.group(2)))
+        elif take(rf'\b{count_verbs} no documents\b|\bwithout documents\b'):
+            plan.document_count = ('=', 0)
+
+        match = take(rf'\b(?:with )?(?:completion |progress )?({COMPARISON_WORDS}) (\d+) ?(?:%|percent)(?: completion| progress| complete)?')
+        if match:
+            plan.filters.append(('process_assignments', 'completion_percentage',
+                                 COMPARISON_OPERATORS[match.group(1)], int(match.group(2))))
+
+        if self.vocabulary_pattern is not None:
+            while True:
+                match = take(self.vocabulary_pattern)
+                if not match:
+                    break
+                plan.add_equality(*self.vocabulary[match.group(0)])
+
+        for relation, pattern in RELATION_PATTERNS:
+            if take(pattern):
+                plan.relation = relation
+                break
+
+        earliest = None
+        for table, pattern in ENTITY_PATTERNS:
+            match = re.search(pattern, text)
+            if match and (earliest is None or match.start() < earliest):
+                plan.head, earliest = table, match.start()
+        if plan.head is None:
+            raise ValueError(f"Could not understand the query: '{query}'")
+        take(dict(ENTITY_PATTERNS)[plan.head])
+
+        # Status words mean different things depending on what is being listed
+        while True:
+            match = take(r'\b(approved|rejected)\b')
+            if not match:
+                break
+            plan.add_equality('document_submissions', 'validation_status', match.group(1))
+        while take(r'\bpending\b'):
+            if plan.head == 'document_submissions':
+                plan.add_equality('document_submissions', 'validation_status', 'pending')
+            else:
+                plan.add_equality('process_assignments', 'status', 'pending')
+        while take(r'\b(?:completed|complete|finished)\b'):
+            plan.add_equality('process_assignments', 'status', 'completed')
+        while True:
+            match = take(r'\b(active|inactive)\b')
+            if not match:
+                break
+            plan.add_equality('processes', 'status', match.group(1))
+
+        # Whatever is left, split at parsed text and at "and"/"or", may name customers
+        unknown = []
+        for chunk in re.split(r'\||\b(?:and|or)\b', text):
+            words = chunk.split()
+            while words and words[0] in FILLER_WORDS:
+                words.pop(0)
+            while words and words[-1] in FILLER_WORDS:
+                words.pop()
+            if not words:
+                continue
+            fragment = ' '.join(words)
+            names = []
+            if self.is_name_fragment(fragment) and 'name' in self.columns.get('customers', {}):
+                names = self._lookup_customers(fragment)
+            if not names:
+                unknown.append(fragment)
+            elif len(names) > MAX_NAME_MATCHES:
+                raise ValueError(f"'{fragment}' matches too many customers; use a full name")
+            else:
+                for name in names:
+                    plan.add_equality('customers', 'name', name)
+
+        # Other entity words are fine once they are qualified by a filter ("rejected documents")
+        filtered_tables = {table for table, _, _, _ in plan.filters}
+        leftover = []
+        for fragment in unknown:
+            for table, pattern in ENTITY_PATTERNS:
+                if table in filtered_tables:
+                    fragment = re.sub(pattern, ' ', fragment)
+            leftover += [word for word in fragment.split() if word not in FILLER_WORDS]
+        if leftover:
+            raise ValueError(f"Could not understand '{' '.join(leftover)}' in the query: '{query}'")
+        return plan
+
+    def _selectivity(self, table: str, column: str, operator: str) -> float:
+        """Estimate the fraction of rows a filter keeps"""
+        if operator != '=':
+            return RANGE_SELECTIVITY
+        rows_per_key = self.index_stats.get((table, column))
+        rows = self.row_counts.get(table, 0)
+        if rows_per_key and rows:
+            return min(1.0, rows_per_key / rows)
+        return EQUALITY_SELECTIVITY
+
+    def _estimate_rows(self, table: str, filters: List[Tuple]) -> float:
+        """Estimated rows left in a table after applying its own filters"""
+        rows = float(self.row_counts.get(table, 0))
+        for filter_table, column, operator, value in filters:
+            if filter_table != table:
+                continue
+            if operator == 'IN':
+                rows *= min(1.0, len(value) * self._selectivity(table, column, '='))
+            else:
+                rows *= self._selectivity(table, column, operator)
+        return rows
+
+    def _join_condition(self, left: str, right: str) -> str:
+        """ON condition for the foreign key between two tables"""
+        for child, child_column, parent, parent_column in self.foreign_keys:
+            if {child, parent} == {left, right}:
+                return f"{self._alias(child)}.{child_column} = {self._alias(parent)}.{parent_column}"
+        raise ValueError(f"No foreign key between '{left}' and '{right}'")
+
+    def _join_path(self, head: str, target: str, relation: Optional[str]) -> List[str]:
+        """Tables from `head` to `target`, picked by relationship rather than table size"""
+        if head == target:
+            return [head]
+        if any({child, parent} == {head, target} for child, _, parent, _ in self.foreign_keys):
+            return [head, target]
+        paths = JOIN_PATHS.get((head, target))
+        if not paths:
+            raise ValueError(f"Cannot relate {head} to {target}")
+        through = paths.get(relation) or next(iter(paths.values()))
+        return [head] + through + [target]
+
+    @staticmethod
+    def _alias(table: str) -> str:
+        return ''.join(part[0] for part in table.split('_'))
+
+    @staticmethod
+    def _literal(value) -> str:
+        if isinstance(value, (int, float)):
+            return str(value)
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def _date_column(self, table: str) -> str:
+        for column, column_type in self.columns[table].items():
+            if 'TIMESTAMP' in column_type or 'DATE' in column_type:
+                return column
+        raise ValueError(f"Cannot order {table} by date")
+
+    def _document_count_join(self, head: str, joined: List[str]) -> str:
+        """LEFT JOIN a pre-aggregated document count keyed on whatever is being listed"""
+        keys = []
+        for child, child_column, parent, parent_column in self.foreign_keys:
+            if child != 'document_submissions':
+                continue
+            if parent in joined:
+                keys.append((child_column, f"{self._alias(parent)}.{parent_column}"))
+            elif child_column in self.columns[head]:
+                keys.append((child_column, f"{self._alias(head)}.{child_column}"))
+        if head == 'document_submissions' or not keys:
+            raise ValueError(f"Cannot count documents for {head}")
+
+        key_columns = ', '.join(column for column, _ in keys)
+        conditions = ' AND '.join(f"dc.{column} = {target}" for column, target in keys)
+        return (f"LEFT JOIN (SELECT {key_columns}, COUNT(*) AS document_count "
+                f"FROM document_submissions GROUP BY {key_columns}) dc ON {conditions}")
+
+    def compile(self, plan: QueryPlan) -> str:
+        """Turn a plan into one SQL statement"""
+        if plan.head is None:
+            raise ValueError("Could not find what to list in the query")
+        head = plan.head
+        head_alias = self._alias(head)
+
+        targets = [table for table, _, _, _ in plan.filters]
+        if plan.order and plan.order[0] == 'completion':
+            targets.append('process_assignments')
+
+        joined = [head]
+        joins = []
+        for target in targets:
+            path = self._join_path(head, target, plan.relation)
+            for previous, table in zip(path, path[1:]):
+                if table not in joined:
+                    joined.append(table)
+                    joins.append(f"JOIN {table} {self._alias(table)} ON {self._join_condition(previous, table)}")
+        if plan.document_count or (plan.order and plan.order[0] == 'document_count'):
+            joins.append(self._document_count_join(head, joined))
+        document_count = 'COALESCE(dc.document_count, 0)'
+
+        if plan.count_only:
+            select = f"SELECT COUNT(DISTINCT {head_alias}.id) AS {TABLE_LABELS.get(head, head)}_count"
+        else:
+            display = DISPLAY_COLUMNS.get(head) or list(self.columns[head])
+            columns = [f"{head_alias}.{column}" for column in display]
+            for table, column, _, _ in plan.filters:
+                if table != head:
+                    expression = f"{self._alias(table)}.{column} AS {TABLE_LABELS.get(table, table)}_{column}"
+                    if expression not in columns:
+                        columns.append(expression)
+            completion = "pa.completion_percentage AS assignment_completion_percentage"
+            if plan.order and plan.order[0] == 'completion' and head != 'process_assignments' \
+                    and completion not in columns:
+                columns.append(completion)
+            if plan.document_count or (plan.order and plan.order[0] == 'document_count'):
+                columns.append(f"{document_count} AS document_count")
+            distinct = 'DISTINCT ' if len(joined) > 1 else ''
+            select = f"SELECT {distinct}{', '.join(columns)}"
+
+        sql = [select, f"FROM {head} {head_alias}"] + joins
+
+        conditions = []
+        for table, column, operator, value in plan.filters:
+            if operator == 'IN':
+                value = '(' + ', '.join(self._literal(item) for item in value) + ')'
+            else:
+                value = self._literal(value)
+            conditions.append(f"{self._alias(table)}.{column} {operator} {value}")
+        if plan.document_count:
+            operator, value = plan.document_count
+            conditions.append(f"{document_count} {operator} {value}")
+        if conditions:
+            sql.append("WHERE " + ' AND '.join(conditions))
+
+        if plan.count_only:
+            return '\n'.join(sql)
+
+        if plan.order:
+            key, direction = plan.order
+            if key == 'document_count':
+                expression = 'document_count'
+            elif key == 'completion':
+                expression = 'pa.completion_percentage'
+            elif key == 'name':
+                if 'name' not in self.columns[head]:
+                    raise ValueError(f"Cannot order {head} by name")
+                expression = f"{head_alias}.name"
+            else:
+                expression = f"{head_alias}.{self._date_column(head)}"
+            sql.append(f"ORDER BY {expression} {direction}, {head_alias}.id {direction}")
+
+        limit = plan.limit
+        # Rough heuristic: only the head table's own filters are counted; filters on
+        # joined tables and document counts are ignored
+        if limit is None and self._estimate_rows(head, plan.filters) > MAX_RESULT_ROWS:
+            limit = plan.auto_limit = MAX_RESULT_ROWS
+        if limit is not None:
+            sql.append(f"LIMIT {limit}")
+
+        return '\n'.join(sql)
+
 
 class NLQueryProcessor:
+    """Answer natural language questions about the QuickDocs database.
+
+    Creating a processor only reads the database; call planner.analyze() at
+    start-up to refresh the table statistics the query planner uses.
+    """
+
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.schema_info = self._get_schema_info()
+        self.planner = QueryPlanner(db_path)
     
     def _get_schema_info(self) -> Dict:
         """Get database schema information"""
@@ -47,20 +622,6 @@ class NLQueryProcessor:
         
         return ' '.join(filtered_words)
 
-    def process_query(self, nl_query: str) -> Tuple[str, List, str]:
-        """Process natural language query and return SQL, results, and explanation"""
-        try:
-            # Preprocess the query
-            cleaned_query = self._preprocess_query(nl_query)
-            print(f"Original: '{nl_query}' -> Cleaned: '{cleaned_query}'")  # Debug
-            
-            sql_query = self._convert_nl_to_sql(cleaned_query)
-            results = self._execute_query(sql_query)
-            explanation = f"Converted query '{nl_query}' to SQL and found {len(results)} results."
-            return sql_query, results, explanation
-        except Exception as e:
-            return "", [], f"Error processing query: {str(e)}"
-
     def process_query(self, nl_query: str) -> Tuple[str, List, str]:
         """
         Process natural language query and return SQL, results, and explanation
@@ -71,16 +632,21 @@ class NLQueryProcessor:
             # Remove question marks and other punctuation that shouldn't be in search
             cleaned_query = cleaned_query.replace('?', '').replace('.', '').replace('!', '')
             
-            sql_query = self._convert_nl_to_sql(cleaned_query)
+            sql_query, auto_limit = self._convert_nl_to_sql(cleaned_query)
             results = self._execute_query(sql_query)
             explanation = f"Converted query '{nl_query}' to SQL and found {len(results)} results."
+            if auto_limit is not None and len(results) >= auto_limit:
+                explanation += f" Only the first {auto_limit} rows are shown; ask for 'top N' to change this."
             return sql_query, results, explanation
         except Exception as e:
             return "", [], f"Error processing query: {str(e)}"
 
     
-    def _convert_nl_to_sql(self, query: str) -> str:
-        """Convert natural language to SQL using pattern matching"""
+    def _convert_nl_to_sql(self, query: str) -> Tuple[str, Optional[int]]:
+        """Convert natural language to SQL using the query planner and pattern matching.
+
+        Returns the SQL and the row limit the planner added on its own, if any.
+        """
     
         # Updated patterns with more flexibility
         patterns = [
@@ -130,16 +696,6 @@ class NLQueryProcessor:
                         LIMIT 1'''
             },
             
-            # Additional useful patterns
-            {
-                'pattern': r'show (?:all )?(?:the )?completed processes',
-                'sql': '''SELECT c.name as customer_name, p.name as process_name, pa.completion_percentage
-                        FROM process_assignments pa
-                        JOIN customers c ON pa.customer_id = c.id
-                        JOIN processes p ON pa.process_id = p.id
-                        WHERE pa.status = 'completed' '''
-            },
-            
             {
                 'pattern': r'list (?:all )?(?:the )?document types',
                 'sql': 'SELECT name, description FROM document_types ORDER BY name'
@@ -180,10 +736,10 @@ class NLQueryProcessor:
         ]
 
         
-        # Try to match patterns
+        # Try to match patterns against the whole query, so no extra clause is dropped
         for pattern_obj in patterns:
             pattern = pattern_obj['pattern']
-            match = re.search(pattern, query)
+            match = re.fullmatch(pattern, query)
             
             if match:
                 if 'sql_template' in pattern_obj:
@@ -191,12 +747,18 @@ class NLQueryProcessor:
                     param = match.group(1).strip()
                     # Remove common punctuation that interferes with database queries
                     param = param.replace('?', '').replace('.', '').replace('!', '').strip()
-                    return pattern_obj['sql_template'].format(param)
+                    # Anything more than a name fragment ("home loan and kyc") is left to the planner
+                    if not self.planner.is_name_fragment(param):
+                        continue
+                    return pattern_obj['sql_template'].format(param.replace("'", "''")), None
                 else:
-                    return pattern_obj['sql']
+                    return pattern_obj['sql'], None
         
-        # If no pattern matches
-        raise ValueError(f"Could not understand the query: '{query}'")
+        # Everything else is composed by the planner, which rejects anything it doesn't understand
+        self.planner.refresh()
+        plan = self.planner.parse(query)
+        sql = self.planner.compile(plan)
+        return sql, plan.auto_limit
 
     
     def _execute_query(self, sql_query: str) -> List[Dict]:
@@ -220,6 +782,7 @@ class NLQueryProcessor:
 def main():
     """Command-line interface for testing"""
     processor = NLQueryProcessor('quickdocs.db')
+    processor.planner.analyze()
     
     print("=== QuickDocs Natural Language Query Interface ===")
     print("Try queries like:")
@@ -0,0 +1,206 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'nlp_query'))
+
+from query_interface import NLQueryProcessor, QueryPlanner  # noqa: E402
+
+
+def build_database(path: str):
+    """Create a database from the schema and sample data in database/"""
+    conn = sqlite3.connect(path)
+    for name in ('schema.sql', 'sample_data.sql'):
+        with open(os.path.join(ROOT, 'database', name)) as f:
+            conn.executescript(f.read())
+    conn.commit()
+    conn.close()
+
+
+class QueryInterfaceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'quickdocs.db')
+        build_database(self.db_path)
+        self.processor = NLQueryProcessor(self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def query(self, text: str):
+        sql, results, explanation = self.processor.process_query(text)
+        self.assertTrue(sql, explanation)
+        return sql, results
+
+    def assertNotUnderstood(self, text: str):
+        sql, results, explanation = self.processor.process_query(text)
+        self.assertEqual(sql, '')
+        self.assertIn('Could not understand', explanation)
+
+    def test_composed_query(self):
+        sql, results = self.query('Pending Home Loan customers with fewer than 3 documents, newest first')
+        self.assertEqual(sql.count('SELECT'), 2)
+        self.assertEqual({row['name'] for row in results}, {'Rajesh Kumar', 'Sunita Gupta'})
+        self.assertTrue(all(row['document_count'] < 3 for row in results))
+
+    def test_query_examples(self):
+        _, results = self.query('How many KYC customers with at least 2 documents')
+        self.assertEqual(results, [{'customer_count': 1}])
+
+        _, results = self.query('Top 3 customers by documents')
+        self.assertEqual([row['name'] for row in results][:1], ['Priya Sharma'])
+        self.assertEqual(len(results), 3)
+
+        _, results = self.query('Customers above 50% completion sorted by completion')
+        self.assertEqual([row['name'] for row in results], ['Amit Singh', 'Priya Sharma'])
+
+    def test_fixed_patterns_still_used(self):
+        sql, results = self.query('Show all customers')
+        self.assertEqual(sql, 'SELECT id, name, email, phone, registration_date '
+                              'FROM customers ORDER BY registration_date DESC')
+        self.assertEqual(len(results), 5)
+
+        _, results = self.query('show pending processes')
+        self.assertEqual(len(results), 4)
+        self.assertIn('customer_name', results[0])
+
+        _, results = self.query('Which process has the most documents?')
+        self.assertEqual(results, [{'name': 'Home Loan Application', 'document_count': 6}])
+
+    def test_partial_names_use_fixed_templates(self):
+        _, results = self.query('How many documents has Kumar submitted?')
+        self.assertEqual(results, [{'name': 'Rajesh Kumar', 'document_count': 1}])
+
+        _, results = self.query('Which customers are assigned to Loan Application?')
+        self.assertEqual({row['name'] for row in results}, {'Rajesh Kumar', 'Priya Sharma', 'Sunita Gupta'})
+
+        _, results = self.query('Which customers are assigned to verification')
+        self.assertEqual({row['name'] for row in results}, {'Amit Singh', 'Vikram Patel'})
+
+    def test_customer_names_in_planned_queries(self):
+        _, results = self.query('pending customers named rajesh or priya')
+        self.assertAllNamed(results, {'Rajesh Kumar', 'Priya Sharma'})
+
+        _, results = self.query('show customer sharma details newest first')
+        self.assertAllNamed(results, {'Priya Sharma'})
+
+    def assertAllNamed(self, results, names):
+        self.assertEqual({row['name'] for row in results}, names)
+
+    def test_single_clause_is_not_dropped(self):
+        _, results = self.query('show customers over 50 percent')
+        self.assertEqual({row['name'] for row in results}, {'Amit Singh', 'Priya Sharma'})
+
+        _, results = self.query('show customers sorted by name')
+        names = [row['name'] for row in results]
+        self.assertEqual(names, sorted(names))
+
+        _, results = self.query('show all customers top 2')
+        self.assertEqual(len(results), 2)
+
+    def test_filter_on_listed_table(self):
+        _, results = self.query('approved documents')
+        self.assertEqual(len(results), 9)
+
+        _, results = self.query('How many documents has Rajesh submitted?')
+        self.assertEqual(results, [{'name': 'Rajesh Kumar', 'document_count': 1}])
+
+    def test_repeated_values_become_in(self):
+        sql, results = self.query('customers assigned to home loan and kyc')
+        self.assertIn("p.name IN ('Home Loan Application', 'KYC Verification')", sql)
+        self.assertEqual(len({row['id'] for row in results}), 5)
+
+        sql, results = self.query('pending completed customers')
+        self.assertIn("pa.status IN ('pending', 'completed')", sql)
+        self.assertEqual(len({row['id'] for row in results}), 5)
+
+    def test_submitted_document_count(self):
+        _, results = self.query('customers who submitted more than 2 documents')
+        self.assertEqual([row['name'] for row in results], ['Priya Sharma'])
+
+    def test_unparsed_words_are_rejected(self):
+        self.assertNotUnderstood('delete all customers')
+        self.assertNotUnderstood('customers who are not pending')
+        self.assertNotUnderstood('customers not in kyc')
+        self.assertNotUnderstood('customers with 3')
+        self.assertNotUnderstood('tell me about the weather')
+        self.assertNotUnderstood('customers who will be pending')
+
+    def test_join_path_follows_relationship(self):
+        sql, _ = self.query('document types for kyc')
+        self.assertIn('process_document_requirements', sql)
+        self.assertNotIn('document_submissions', sql)
+
+        sql, _ = self.query('document types submitted for kyc')
+        self.assertIn('document_submissions', sql)
+
+        sql, _ = self.query('Home Loan customers')
+        self.assertIn('process_assignments', sql)
+        self.assertNotIn('document_submissions', sql)
+
+    def test_join_path_ignores_table_sizes(self):
+        planner = self.processor.planner
+        planner.row_counts['document_submissions'] = 1
+        planner.row_counts['process_assignments'] = 10 ** 6
+        sql = planner.compile(planner.parse('home loan customers'))
+        self.assertIn('process_assignments', sql)
+        self.assertNotIn('document_submissions', sql)
+
+    def test_alias_does_not_shadow_entity_words(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO processes (name, description) VALUES ('Customer Onboarding', '')")
+        conn.commit()
+        conn.close()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO processes (name, description) VALUES ('Pending', '')")
+        conn.commit()
+        conn.close()
+        planner = QueryPlanner(self.db_path)
+        self.assertIn('customer onboarding', planner.vocabulary)
+        self.assertNotIn('customer', planner.vocabulary)
+        self.assertNotIn('pending', planner.vocabulary)
+        plan = planner.parse('pending customers')
+        self.assertEqual(plan.head, 'customers')
+        self.assertEqual(plan.filters, [('process_assignments', 'status', '=', 'pending')])
+
+    def test_automatic_limit_is_reported(self):
+        planner = self.processor.planner
+        planner.row_counts['customers'] = 10 ** 6
+        sql, results, explanation = self.processor.process_query('customers sorted by name')
+        self.assertTrue(sql.endswith('LIMIT 200'))
+        self.assertEqual(len(results), 5)
+
+        with unittest.mock.patch('query_interface.MAX_RESULT_ROWS', 2):
+            sql, results, explanation = self.processor.process_query('customers sorted by name')
+        self.assertEqual(len(results), 2)
+        self.assertIn('Only the first 2 rows are shown', explanation)
+
+    def test_creating_processor_does_not_write(self):
+        conn = sqlite3.connect(self.db_path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        conn.close()
+        self.assertNotIn('sqlite_stat1', tables)
+        self.assertEqual(self.processor.planner.row_counts['customers'], 5)
+
+    def test_analyze_refreshes_statistics(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("INSERT INTO customers (name, email, phone) VALUES (?, ?, ?)",
+                         [(f'Customer {i}', f'customer{i}@email.com', '9000000000') for i in range(5)])
+        conn.commit()
+        conn.close()
+
+        planner = self.processor.planner
+        planner.analyze()
+        self.assertEqual(planner.row_counts['customers'], 10)
+        conn = sqlite3.connect(self.db_path)
+        stat = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = 'customers'").fetchone()[0]
+        conn.close()
+        self.assertEqual(int(stat.split()[0]), 10)
+
+if __name__ == '__main__':
+    unittest.main()